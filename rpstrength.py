@@ -1,14 +1,17 @@
 from __future__ import annotations
-import json
 import argparse
+import re
+import sys
+import time
 from datetime import datetime, UTC
 from pathlib import Path
+import orjson
 import requests
-import browser_cookie3
-import brotli
-import zlib
-import pandas as pd
-from collections import defaultdict
+from requests.adapters import HTTPAdapter
+from collections import deque, namedtuple
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 
 CONF_DIR = Path("conf")
 CONF_DIR.mkdir(exist_ok=True)
@@ -20,146 +23,269 @@ DEFAULT_MUSCLE_GROUP_MAP = [
     "[[Calves]]", "[[Traps]]", "[[Forearms]]", "[[Abs]]"
 ]
 
-def summarize_exercises(meso_data, exercise_lookup):
-    from collections import defaultdict
-    exercise_weekly = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
-    exercise_max_effort = defaultdict(lambda: {"weight": 0, "reps": 0})
-    day_exercise_map = defaultdict(list)
+# Day labels in the order summaries list them; other labels are left out
+WEEKDAY_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# One "N" or "N-M" token of the interactive mesocycle selection
+SELECTION_RANGE_RE = re.compile(r"(\d+)(?:\s*-\s*(\d+))?")
+
+# Obsidian Charts block rendered once per muscle group in the summary
+CHART_TEMPLATE = """```chart
+type: bar
+id: table
+title: "{muscle}"
+select: ["{muscle}"]
+layout: rows
+width: 80%
+beginAtZero: true
+color: "{color}"
+showDataLabels: true
+```"""
+CHART_COLORS = [
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf"
+]
+
+# Catalog entry for one exercise, keyed by exercise ID in the lookup
+Exercise = namedtuple("Exercise", "name muscle_group_id equipment name_link equipment_link")
+
+# Seconds a cached conf/exercises.json is reused before refetching the catalog
+EXERCISES_CACHE_TTL = 24 * 60 * 60
+
+# Concurrent mesocycle detail fetches; the session's connection pool is sized to match
+FETCH_WORKERS = 8
+
+# Threads writing output files; at most this many writes stay outstanding behind the main thread
+IO_WORKERS = 2
+
+# Seconds to wait on the API before a request fails instead of stalling a fetch worker
+REQUEST_TIMEOUT = 30
+
+# Shared HTTP session so every API call reuses pooled keep-alive connections
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_maxsize=FETCH_WORKERS))
 
+# Content negotiation the JSON decoding relies on; urllib3 can decode every listed encoding
+JSON_HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate, br"
+}
+SESSION.headers.update(JSON_HEADERS)
+
+def flatten_mesocycle(meso_data):
+    import numpy as np
+    import pandas as pd
+
+    label_codes = {}
+    entry_label, entry_ex = [], []
+    set_week, set_label, set_ex, set_mg, set_weight, set_reps = [], [], [], [], [], []
+
+    # Single walk over the nested JSON, keeping only the fields the summaries need;
+    # day labels become small integer codes
     for week_index, week in enumerate(meso_data["weeks"], start=1):
         for day in week["days"]:
-            label = day["label"]
+            code = label_codes.setdefault(day["label"], len(label_codes))
             for exercise in day["exercises"]:
                 ex_id = exercise["exerciseId"]
-                key = (label, ex_id)
+                mg_id = exercise.get("muscleGroupId")
+                entry_label.append(code)
+                entry_ex.append(ex_id)
                 for s in exercise["sets"]:
-                    if s["weight"] is not None:
-                        exercise_weekly[key][week_index]["sets"] += 1
-                        if s["weight"] > exercise_max_effort[key]["weight"]:
-                            exercise_max_effort[key] = {"weight": s["weight"], "reps": s["reps"]}
-                if ex_id not in day_exercise_map[label]:
-                    day_exercise_map[label].append(ex_id)
-
-    return exercise_weekly, exercise_max_effort, day_exercise_map
-
-def get_json(url: str, headers: dict) -> dict:
-    headers.update({
-        "Accept": "application/json",
-        "Accept-Encoding": "gzip, deflate, br"
+                    set_week.append(week_index)
+                    set_label.append(code)
+                    set_ex.append(ex_id)
+                    set_mg.append(mg_id)
+                    set_weight.append(s["weight"])
+                    set_reps.append(s["reps"])
+
+    labels = list(label_codes)
+    entries = pd.DataFrame({
+        "label": pd.Categorical.from_codes(entry_label, categories=labels),
+        "ex_id": np.asarray(entry_ex, dtype=np.int64),
+    })
+    # Raw weight/reps objects are kept next to the numeric columns so values render exactly as the API sent them
+    sets = pd.DataFrame({
+        "week": np.asarray(set_week, dtype=np.int32),
+        "label": pd.Categorical.from_codes(set_label, categories=labels),
+        "ex_id": np.asarray(set_ex, dtype=np.int64),
+        "muscle_group": np.asarray(set_mg, dtype=np.float64),
+        "weight": np.asarray(set_weight, dtype=np.float64),
+        "raw_weight": pd.Series(set_weight, dtype=object),
+        "raw_reps": pd.Series(set_reps, dtype=object),
     })
-    response = requests.get(url, headers=headers)
+    return entries, sets
+
+def summarize_exercises(entries, sets, n_weeks):
+    import numpy as np
+    import pandas as pd
+
+    exercise_order = entries.drop_duplicates(["label", "ex_id"])
+    code_index = pd.MultiIndex.from_frame(exercise_order)
+    # Labels outside WEEKDAY_ORDER become NaN here and are dropped from the summary rows
+    day_labels = exercise_order["label"].cat.set_categories(WEEKDAY_ORDER, ordered=True)
+    index = pd.MultiIndex.from_arrays([day_labels, exercise_order["ex_id"]], names=["label", "ex_id"])
+    weighted = sets[sets["weight"].notna()]
+
+    # Row of each weighted set's (day, exercise) pair; counts are binned per flattened (row, week) cell
+    group = code_index.get_indexer(pd.MultiIndex.from_frame(weighted[["label", "ex_id"]]))
+    cells = group * n_weeks + weighted["week"].to_numpy() - 1
+    counts = np.bincount(cells, minlength=len(code_index) * n_weeks).reshape(len(code_index), n_weeks)
+    weekly_sets = pd.DataFrame(counts, index=index, columns=range(1, n_weeks + 1))
+
+    # Reps belong to the first set reaching the heaviest (positive) weight
+    weights = weighted["weight"].to_numpy()
+    heaviest = np.zeros(len(code_index))
+    np.maximum.at(heaviest, group, weights)
+    is_max = (weights > 0) & (weights == heaviest[group])
+    hit, first = np.unique(group[is_max], return_index=True)
+    rows = np.flatnonzero(is_max)[first]
+    max_weight = np.zeros(len(code_index), dtype=object)
+    max_reps = np.zeros(len(code_index), dtype=object)
+    max_weight[hit] = weighted["raw_weight"].to_numpy()[rows]
+    max_reps[hit] = weighted["raw_reps"].to_numpy()[rows]
+    max_effort = pd.DataFrame({"weight": max_weight, "reps": max_reps}, index=index)
+
+    # Order rows Monday..Sunday via the categorical dtype, dropping non-weekday labels;
+    # the stable sort keeps exercises in first-seen order within a day
+    row_order = day_labels.reset_index(drop=True).dropna().sort_values(kind="stable").index
+    return weekly_sets.iloc[row_order], max_effort.iloc[row_order]
+
+def get_json(url: str) -> dict:
+    # Auth headers live on SESSION; urllib3 decodes gzip/deflate, and br too since brotli is installed
+    response = SESSION.get(url, timeout=REQUEST_TIMEOUT)
     response.raise_for_status()
-    try:
-        return response.json()
-    except requests.exceptions.JSONDecodeError:
-        content_type = response.headers.get("Content-Encoding", "")
-        raw = response.content
-        if "br" in content_type:
-            decoded = brotli.decompress(raw).decode("utf-8")
-        elif "gzip" in content_type:
-            decoded = zlib.decompress(raw, zlib.MAX_WBITS | 16).decode("utf-8")
-        elif "deflate" in content_type:
-            decoded = zlib.decompress(raw).decode("utf-8")
-        else:
-            decoded = raw.decode("utf-8", errors="replace")
-        return json.loads(decoded)
+    return orjson.loads(response.content)
+
+def get_json_cached(url: str, cache_path: Path):
+    # Conditional GET against the cached copy; the validators of the last download sit next to it
+    validators_path = cache_path.with_suffix(".etag.json")
+    conditional_headers = {}
+    if cache_path.exists() and validators_path.exists():
+        validators = orjson.loads(validators_path.read_bytes())
+        if validators.get("etag"):
+            conditional_headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            conditional_headers["If-Modified-Since"] = validators["last_modified"]
+
+    response = SESSION.get(url, headers=conditional_headers, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 304:
+        cache_path.touch()
+        return orjson.loads(cache_path.read_bytes())
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+    save_json(data, cache_path)
+    save_json({"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}, validators_path)
+    return data
 
 def save_json(data, path: Path):
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
+def read_json(path: Path | None):
+    # A single open() instead of exists() + open(); a missing or unset path yields None
+    if path is None:
+        return None
+    try:
+        return orjson.loads(path.read_bytes())
+    except FileNotFoundError:
+        return None
 
 def load_muscle_group_map(path: Path = None):
-    if path and path.exists():
-        return json.load(path.open("r", encoding="utf-8"))
-    return DEFAULT_MUSCLE_GROUP_MAP
-
-def load_exercise_lookup(headers: dict, file_path: Path = None) -> dict:
-    if file_path and file_path.exists():
-        with file_path.open("r", encoding="utf-8") as f:
-            exercise_metadata = json.load(f)
-    else:
+    muscle_group_map = read_json(path)
+    return DEFAULT_MUSCLE_GROUP_MAP if muscle_group_map is None else muscle_group_map
+
+def load_exercise_lookup(file_path: Path = None) -> dict:
+    cache_path = CONF_DIR / "exercises.json"
+    exercise_metadata = read_json(file_path)
+    if exercise_metadata is None:
+        # Fall back to the cached catalog from a previous run while it is still fresh
+        try:
+            if time.time() - cache_path.stat().st_mtime < EXERCISES_CACHE_TTL:
+                exercise_metadata = read_json(cache_path)
+        except FileNotFoundError:
+            pass
+    if exercise_metadata is None:
         url = "https://training.rpstrength.com/api/training/exercises"
-        exercise_metadata = get_json(url, headers)
-        save_json(exercise_metadata, CONF_DIR / "exercises.json")
-    return {
-        exercise["id"]: {
-            "name": exercise["name"],
-            "muscle_group_id": exercise["muscleGroupId"],
-            "equipment": exercise["exerciseType"].replace("-", " ").title()
-        } for exercise in exercise_metadata
-    }
-
-def format_training_day(day: dict, week_index: int, exercise_lookup: dict, muscle_group_map: dict) -> str:
+        exercise_metadata = get_json_cached(url, cache_path)
+    lookup = {}
+    for exercise in exercise_metadata:
+        name = exercise["name"]
+        # Only a handful of equipment types exist, so every exercise shares the interned strings
+        equipment = sys.intern(exercise["exerciseType"].replace("-", " ").title())
+        # Obsidian links are built once here instead of on every rendered exercise
+        lookup[exercise["id"]] = Exercise(
+            name=name,
+            muscle_group_id=exercise["muscleGroupId"],
+            equipment=equipment,
+            name_link=f"[[{name}]]",
+            equipment_link=sys.intern(f"[[{equipment}]]")
+        )
+    return lookup
+
+def lookup_exercise(exercise_lookup: dict, ex_id) -> Exercise:
+    # Exercises missing from the catalog render with placeholder names
+    exercise = exercise_lookup.get(ex_id)
+    if exercise is None:
+        return Exercise(f"Exercise {ex_id}", None, "Unknown", f"[[Exercise {ex_id}]]", "[[Unknown]]")
+    return exercise
+
+def muscle_group_label(mg_lookup: dict, mg_id) -> str:
+    # Unknown or missing IDs get a placeholder link instead of failing
+    return mg_lookup.get(mg_id) or f"[[MuscleGroup {mg_id}]]"
+
+def format_training_day(day: dict, week_index: int, resolved: dict) -> str:
     date_str = day.get('finishedAt', '')[:10] if day.get('finishedAt') else 'TBD'
     header = f"## Week {week_index + 1} - Day {day['position'] + 1} - {day['label']} ([[{date_str}]])\n\n"
     day_sections = [header]
 
     for exercise_entry in day['exercises']:
-        exercise_info = exercise_lookup.get(exercise_entry['exerciseId'], {})
-        mg_id = exercise_info.get("muscle_group_id")
-        muscle_group = muscle_group_map[mg_id - 1] if mg_id and 0 < mg_id <= len(muscle_group_map) else f"[[MuscleGroup {mg_id}]]"
-        exercise_name = exercise_info.get("name", f"Exercise {exercise_entry['exerciseId']}")
-        equipment_type = exercise_info.get("equipment", "Unknown")
-
-        exercise_block = f"### {muscle_group} — [[{exercise_name}]]\n\n[[{equipment_type}]]\n\n"
-        exercise_block += "| Weight | Reps |\n| ------ | ---- |\n"
+        muscle_group, name_link, equipment_link = resolved[exercise_entry['exerciseId']]
 
-        for exercise_set in exercise_entry["sets"]:
-            exercise_block += f"| {exercise_set['weight']} | {exercise_set['reps']} |\n"
+        exercise_block = [
+            f"### {muscle_group} — {name_link}\n\n{equipment_link}\n\n",
+            "| Weight | Reps |\n| ------ | ---- |\n"
+        ]
+        exercise_block.extend(f"| {exercise_set['weight']} | {exercise_set['reps']} |\n" for exercise_set in exercise_entry["sets"])
+        exercise_block.append("\n")
 
-        day_sections.append(exercise_block + "\n")
+        day_sections.append(''.join(exercise_block))
 
     day_sections.append("---\n\n")
     return ''.join(day_sections)
 
-def build_summary_chart_block(weeks, muscle_group_map):
-    # Build weekly volume summary
-    weekly_sets = defaultdict(lambda: defaultdict(int))
-    for week_index, week in enumerate(weeks, start=1):
-        for day in week.get("days", []):
-            for exercise_entry in day.get("exercises", []):
-                muscle_group = exercise_entry.get("muscleGroupId", None)
-                if muscle_group is None:
-                    continue
-                for exercise_set in exercise_entry.get("sets", []):
-                    weekly_sets[week_index][muscle_group] += 1
-    df_summary = pd.DataFrame(weekly_sets).fillna(0).astype(int)
-    # Try to rename index using muscle_group_map, fallback to str
-    def mg_label(mg_id):
-        return muscle_group_map[mg_id - 1] if mg_id and 0 < mg_id <= len(muscle_group_map) else f"[[MuscleGroup {mg_id}]]"
-    df_summary = df_summary.rename(index=mg_label)
-    table_lines = ["| Muscle | " + " | ".join(f"W{w}" for w in df_summary.columns) + " |",
-                   "|" + "--------|" * (len(df_summary.columns) + 1)]
-    for muscle in df_summary.index:
-        row = [muscle] + [str(df_summary.loc[muscle, w]) for w in df_summary.columns]
-        table_lines.append("| " + " | ".join(row) + " |")
-    table_lines.append("^table")
-    colors = [
-        "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
-        "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf"
+def build_summary_chart_block(sets, mg_lookup):
+    import numpy as np
+
+    # Build weekly volume summary: counts[muscle group code, week - 1] over every set that has a muscle group.
+    # Raw IDs are mapped to dense codes first, so odd IDs (negative or huge) cannot break or bloat the matrix
+    has_mg = sets["muscle_group"].notna().to_numpy()
+    mg_ids = sets["muscle_group"].to_numpy()[has_mg].astype(np.int64)
+    weeks = sets["week"].to_numpy()[has_mg]
+    unique_ids, first_seen, codes = np.unique(mg_ids, return_index=True, return_inverse=True)
+    n_weeks = weeks.max() if weeks.size else 0
+    counts = np.bincount(codes * n_weeks + weeks - 1, minlength=len(unique_ids) * n_weeks).reshape(len(unique_ids), n_weeks)
+
+    # Muscle groups in first-seen order; only weeks with at least one set get a column
+    order = np.argsort(first_seen)
+    week_columns = np.flatnonzero(counts.any(axis=0)) + 1
+    counts = counts[np.ix_(order, week_columns - 1)]
+    muscles = [muscle_group_label(mg_lookup, mg_id) for mg_id in unique_ids[order].tolist()]
+
+    table = "\n".join([
+        "| Muscle | " + " | ".join(f"W{w}" for w in week_columns.tolist()) + " |",
+        "|" + "--------|" * (len(week_columns) + 1),
+        *("| " + muscle + " | " + " | ".join(map(str, row)) + " |" for muscle, row in zip(muscles, counts.tolist())),
+        "^table"
+    ])
+    chart_blocks = [
+        CHART_TEMPLATE.format(muscle=muscle, color=CHART_COLORS[idx % len(CHART_COLORS)])
+        for idx, muscle in enumerate(muscles)
     ]
-    chart_blocks = []
-    for idx, muscle in enumerate(df_summary.index):
-        color = colors[idx % len(colors)]
-        chart_blocks.append("\n".join([
-            "```chart",
-            "type: bar",
-            "id: table",
-            f'title: "{muscle}"',
-            f'select: ["{muscle}"]',
-            "layout: rows",
-            "width: 80%",
-            "beginAtZero: true",
-            f'color: "{color}"',
-            "showDataLabels: true",
-            "```"
-        ]))
-    chart_summary = "\n".join(table_lines + ["\n## Summary\n"] + chart_blocks)
+    chart_summary = "\n".join([table, "\n## Summary\n", *chart_blocks])
     return chart_summary
 
-def generate_mesocycle_markdown(mesocycle_data: dict, source_filename: str, exercise_lookup: dict, frontmatter_template: str, muscle_group_map: dict) -> str:
+def generate_mesocycle_markdown(mesocycle_data: dict, entries, sets, weekly_sets, max_effort, source_filename: str, exercise_lookup: dict, frontmatter_template: str, muscle_group_map: dict, now: str) -> Iterator[str]:
+    # The frames come from flatten_mesocycle/summarize_exercises, computed once per mesocycle by the caller
     mesocycle_title = mesocycle_data['name'].replace(' ', '_')
-    now = datetime.now(UTC).strftime("%Y-%m-%d %H:%M UTC")
 
     frontmatter = frontmatter_template.format(
         title=mesocycle_title,
@@ -168,49 +294,64 @@ def generate_mesocycle_markdown(mesocycle_data: dict, source_filename: str, exer
         source=source_filename
     )
 
-    # Group by day label
-    exercise_weekly, exercise_max_effort, day_exercise_map = summarize_exercises(mesocycle_data, exercise_lookup)
+    # Muscle group IDs are 1-based positions in muscle_group_map
+    mg_lookup = {i: label for i, label in enumerate(muscle_group_map, start=1)}
+
+    # Resolve every exercise used in this mesocycle once: (muscle group, name link, equipment link)
+    resolved = {}
+    for ex_id in entries["ex_id"].unique().tolist():
+        exercise = lookup_exercise(exercise_lookup, ex_id)
+        resolved[ex_id] = (muscle_group_label(mg_lookup, exercise.muscle_group_id), exercise.name_link, exercise.equipment_link)
 
     # Build table
-    week_labels = [f"W{w}" for w in range(1, len(mesocycle_data['weeks']) + 1)]
+    week_labels = [f"W{w}" for w in weekly_sets.columns]
     headers = ["Exercise"] + week_labels + ["Total", "Max Weight", "Max Reps"]
-    summary_lines = ["## Exercise Summary", "", "| " + " | ".join(headers) + " |", "|" + " | ".join(["---"] * len(headers)) + " |"]
-
-    WEEKDAY_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    for day_label in WEEKDAY_ORDER:
-        if day_label not in day_exercise_map:
-            continue
-        summary_lines.append(f"| **{day_label}** " + " |" * (len(headers) - 1) + " |")
-        for ex_id in day_exercise_map[day_label]:
-            key = (day_label, ex_id)
-            weekly_counts = [exercise_weekly[key][w]["sets"] for w in range(1, len(mesocycle_data['weeks']) + 1)]
-            total_sets = sum(weekly_counts)
-            max_data = exercise_max_effort[key]
-            name = exercise_lookup.get(ex_id, {}).get("name", f"Exercise {ex_id}")
-            max_weight = max_data["weight"] if max_data["weight"] is not None else ""
-            max_reps = max_data["reps"] if max_data["reps"] is not None and max_data["reps"] >= 0 else ""
-            row = [f"[[{name}]]"] + [str(s) for s in weekly_counts] + [str(total_sets), str(max_weight), str(max_reps)]
-            summary_lines.append("| " + " | ".join(row) + " |")
-
-    chart_summary = build_summary_chart_block(mesocycle_data.get("weeks", []), muscle_group_map)
-    content = frontmatter + "\n\n" + "\n".join(summary_lines) + "\n\n" + chart_summary + "\n"
+    yield frontmatter
+    yield "\n\n## Exercise Summary\n\n"
+    yield "| " + " | ".join(headers) + " |\n"
+    yield "|" + " | ".join(["---"] * len(headers)) + " |\n"
+
+    current_day = None
+    rows = zip(weekly_sets.index, weekly_sets.to_numpy().tolist(), max_effort["weight"], max_effort["reps"])
+    for (day_label, ex_id), weekly_counts, max_weight, max_reps in rows:
+        if day_label != current_day:
+            current_day = day_label
+            yield f"| **{day_label}** " + " |" * (len(headers) - 1) + " |\n"
+        total_sets = sum(weekly_counts)
+        name_link = resolved[ex_id][1]
+        max_weight = max_weight if max_weight is not None else ""
+        max_reps = max_reps if max_reps is not None and max_reps >= 0 else ""
+        yield "| " + " | ".join([name_link, *map(str, weekly_counts), str(total_sets), str(max_weight), str(max_reps)]) + " |\n"
+
+    yield "\n"
+    yield build_summary_chart_block(sets, mg_lookup)
+    yield "\n"
 
     for week_index, week in enumerate(mesocycle_data["weeks"]):
         for training_day in week["days"]:
-            content += format_training_day(training_day, week_index, exercise_lookup, muscle_group_map)
+            yield format_training_day(training_day, week_index, resolved)
 
-    return content
-
-def fetch_mesocycle_detail(api_key: str, headers: dict) -> dict | None:
+def fetch_mesocycle_detail(api_key: str) -> dict | None:
     url = f"https://training.rpstrength.com/api/training/mesocycles/{api_key}"
     try:
-        return get_json(url, headers)
+        return get_json(url)
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 410:
             print(f"[410 Gone] Skipping deleted or expired mesocycle: {api_key}")
             return None
         raise
 
+def fetch_mesocycle_details(executor: ThreadPoolExecutor, keys: list[str]) -> Iterator[dict | None]:
+    # Unlike executor.map, only FETCH_WORKERS downloads are pending at once, so finished
+    # mesocycles wait for the consumer instead of piling up in memory on large selections
+    pending = deque()
+    for key in keys:
+        if len(pending) == FETCH_WORKERS:
+            yield pending.popleft().result()
+        pending.append(executor.submit(fetch_mesocycle_detail, key))
+    while pending:
+        yield pending.popleft().result()
+
 def load_headers_from_file(path: Path) -> dict:
     lines = path.read_text(encoding="utf-8").splitlines()
     headers = {}
@@ -220,136 +361,150 @@ def load_headers_from_file(path: Path) -> dict:
             headers[key.strip()] = value.strip()
     return headers
 
-def load_mesocycles(headers, index_path: Path | None):
-    if index_path and index_path.exists():
-        return json.load(index_path.open("r", encoding="utf-8"))
+def load_mesocycles(index_path: Path | None):
+    meso_list = read_json(index_path)
+    if meso_list is not None:
+        return meso_list
     print("Fetching mesocycles list from API...")
-    meso_list = get_json("https://training.rpstrength.com/api/training/mesocycles", headers)
-    save_json(meso_list, CONF_DIR / "mesocycles.json")
+    meso_list = get_json_cached("https://training.rpstrength.com/api/training/mesocycles", CONF_DIR / "mesocycles.json")
     return meso_list
 
-def resolve_unique_filename(base_path: Path) -> Path:
-    if not base_path.exists():
-        return base_path
+def resolve_unique_filename(base_path: Path, taken: set[str]) -> Path:
+    # `taken` holds the casefolded names already in the directory; the chosen name is reserved in it.
+    # Comparing casefolded names keeps "Push.md" and "push.md" apart on case-insensitive filesystems
+    name = base_path.name
     i = 2
-    while True:
-        candidate = base_path.with_name(f"{base_path.stem} ({i}){base_path.suffix}")
-        if not candidate.exists():
-            return candidate
+    while name.casefold() in taken:
+        name = f"{base_path.stem} ({i}){base_path.suffix}"
         i += 1
+    taken.add(name.casefold())
+    return base_path.with_name(name)
+
+def write_markdown(path: Path, chunks: Iterable[str]):
+    # Stream the Markdown chunks to disk as UTF-8 bytes as they are generated;
+    # a 1 MiB buffer batches the many small chunks into few write() calls.
+    # Chunks go to a temporary file that replaces the target only once rendering
+    # finished, so a failure never leaves a truncated note behind
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        with tmp_path.open("wb", buffering=1 << 20) as out:
+            out.writelines(chunk.encode("utf-8") for chunk in chunks)
+        tmp_path.replace(path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    print(f"Saved {path}")
+
+def drain_writes(writes: deque, limit: int):
+    # Wait on the oldest writes until at most `limit` are outstanding; finished ones are dropped
+    # and the first failed write is raised right away
+    while writes and (len(writes) > limit or writes[0].done()):
+        writes.popleft().result()
+
+def existing_file(value: str) -> Path:
+    path = Path(value)
+    if not path.is_file():
+        raise argparse.ArgumentTypeError(f"file not found: {value}")
+    return path
 
 def main():
     parser = argparse.ArgumentParser(
         description="Convert RP Strength mesocycles to Obsidian-compatible Markdown.",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter
     )
-    parser.add_argument("--index", type=str, required=False, help="Path to mesocycle index JSON file (optional; will fetch from API if missing)")
-    parser.add_argument("--headers", type=str, required=True, help="Path to a .txt file containing headers")
-    parser.add_argument("--exercises", type=str, help="Path to the exercises definition JSON file")
-    parser.add_argument("--frontmatter", type=str, default="frontmatter_template.md", help="Path to frontmatter template file")
-    parser.add_argument("--muscle-groups", type=str, help="Path to optional muscle group mapping JSON file")
+    parser.add_argument("--index", type=Path, required=False, help="Path to mesocycle index JSON file (optional; will fetch from API if missing)")
+    parser.add_argument("--headers", type=existing_file, required=True, help="Path to a .txt file containing headers")
+    parser.add_argument("--exercises", type=Path, help="Path to the exercises definition JSON file")
+    parser.add_argument("--frontmatter", type=existing_file, default="frontmatter_template.md", help="Path to frontmatter template file")
+    parser.add_argument("--muscle-groups", type=existing_file, help="Path to optional muscle group mapping JSON file")
     parser.add_argument("--save-json", action="store_true", help="If set, save the raw JSON for each mesocycle")
     args = parser.parse_args()
 
-    # Validation of required inputs and files
-    if not args.headers:
-        print("Error: --headers must be provided.")
-        return
-    if not Path(args.headers).exists():
-        print(f"Error: headers file not found at {args.headers}")
-        return
-    if not Path(args.frontmatter).exists():
-        print(f"Error: frontmatter file not found at {args.frontmatter}")
-        return
-    if args.muscle_groups and not Path(args.muscle_groups).exists():
-        print(f"Error: muscle_groups file not found at {args.muscle_groups}")
-        return
-    if args.exercises and not Path(args.exercises).exists():
+    # Missing input files are rejected by argparse; only a missing exercises file falls back to the API
+    if args.exercises and not args.exercises.exists():
         print(f"Warning: exercises file not found at {args.exercises}, will try to fetch from API")
 
-    headers = load_headers_from_file(Path(args.headers))
-    muscle_group_map = load_muscle_group_map(Path(args.muscle_groups)) if args.muscle_groups else DEFAULT_MUSCLE_GROUP_MAP
-    frontmatter_template = Path(args.frontmatter).read_text(encoding="utf-8")
-    exercise_lookup = load_exercise_lookup(headers, Path(args.exercises) if args.exercises else None)
+    # pandas is imported only once the arguments are valid, so --help and usage errors stay fast
+    import pandas as pd
 
-    index_path = Path(args.index) if args.index else None
-    meso_list = load_mesocycles(headers, index_path)
+    # Headers copied from a browser may ask for encodings urllib3 cannot decode (e.g. zstd),
+    # so the JSON defaults are applied after them and always win
+    SESSION.headers.update(load_headers_from_file(args.headers))
+    SESSION.headers.update(JSON_HEADERS)
+    muscle_group_map = load_muscle_group_map(args.muscle_groups) if args.muscle_groups else DEFAULT_MUSCLE_GROUP_MAP
+    frontmatter_template = args.frontmatter.read_text(encoding="utf-8")
+    # One timestamp per run keeps created/updated identical across all exported files
+    now = datetime.now(UTC).strftime("%Y-%m-%d %H:%M UTC")
+    exercise_lookup = load_exercise_lookup(args.exercises)
+    meso_list = load_mesocycles(args.index)
 
     # Create output directory if it doesn't exist
     output_dir = Path("output")
     output_dir.mkdir(exist_ok=True)
+    taken_names = {path.name.casefold() for path in output_dir.iterdir()}
 
-    # Collect summary rows for all mesocycles
-    all_exercise_summary_rows = []
+    # Collect one summary frame per mesocycle
+    exercise_summary_frames = []
 
     print("Available mesocycles:")
     for i, meso in enumerate(meso_list):
         print(f"{i}: {meso.get('name', 'Unnamed')}")
 
     selection = input("Enter mesocycle indices to process (e.g., 0,2-4): ")
-    indices = set()
-    for part in selection.split(','):
-        part = part.strip()
-        if '-' in part:
-            start, end = part.split('-', 1)
-            if start.isdigit() and end.isdigit():
-                indices.update(range(int(start), int(end) + 1))
-        elif part.isdigit():
-            indices.add(int(part))
+    indices = set(chain.from_iterable(
+        range(int(start), int(end or start) + 1) for start, end in SELECTION_RANGE_RE.findall(selection)
+    ))
     selected = [meso_list[i] for i in sorted(indices) if 0 <= i < len(meso_list)]
 
-    for meso in selected:
-        key = meso.get("key")
-        if not key:
-            continue
+    # Fetch details concurrently, yielded in selection order; with the bounded writes below,
+    # roughly FETCH_WORKERS + IO_WORKERS mesocycles are held in memory however many are selected
+    # Rendering stays on the main thread; only the disk writes go through a small I/O pool,
+    # which keeps at most IO_WORKERS writes (and the data they hold) outstanding
+    selected = [meso for meso in selected if meso.get("key")]
+    writes = deque()
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor, ThreadPoolExecutor(max_workers=IO_WORKERS) as io_pool:
+        details = fetch_mesocycle_details(executor, [meso["key"] for meso in selected])
+        for meso, meso_data in zip(selected, details):
+            key = meso["key"]
+            if not meso_data:
+                continue
 
-        meso_data = fetch_mesocycle_detail(key, headers)
-        if not meso_data:
-            continue
+            # Sanitize file base name
+            base_name = meso_data['name'].replace('/', '_').strip()
+            output_file = resolve_unique_filename(output_dir / f"{base_name}.md", taken_names)
 
-        # Sanitize file base name
-        base_name = meso_data['name'].replace('/', '_').strip()
-        output_json = resolve_unique_filename(output_dir / f"{base_name}.json")
-        output_file = resolve_unique_filename(output_dir / f"{base_name}.md")
+            # Save raw JSON if requested
+            if args.save_json:
+                writes.append(io_pool.submit(save_json, meso_data, resolve_unique_filename(output_dir / f"{base_name}.json", taken_names)))
 
-        # Save raw JSON before writing Markdown file if requested
-        if args.save_json:
-            save_json(meso_data, output_json)
+            # Flattened and summarized once; the frames feed both the CSV and the Markdown
+            entries, sets = flatten_mesocycle(meso_data)
+            weekly_sets, max_effort = summarize_exercises(entries, sets, len(meso_data["weeks"]))
 
-        # --- Begin summary collection for all_exercise_summary_rows ---
-        exercise_weekly, exercise_max_effort, day_exercise_map = summarize_exercises(meso_data, exercise_lookup)
+            # --- Begin summary collection for exercise_summary_frames ---
 
-        for day_label in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]:
-            if day_label not in day_exercise_map:
-                continue
-            for ex_id in day_exercise_map[day_label]:
-                key2 = (day_label, ex_id)
-                weekly_counts = [exercise_weekly[key2][w]["sets"] for w in range(1, len(meso_data["weeks"]) + 1)]
-                total_sets = sum(weekly_counts)
-                max_data = exercise_max_effort[key2]
-                name = exercise_lookup.get(ex_id, {}).get("name", f"Exercise {ex_id}")
-                all_exercise_summary_rows.append({
+            if not weekly_sets.empty:
+                max_reps = max_effort["reps"]
+                exercise_summary_frames.append(pd.DataFrame({
                     "Mesocycle": output_file.stem,
-                    "Day": day_label,
-                    "Exercise": name,
-                    "Total Sets": total_sets,
-                    "Max Weight": max_data["weight"],
-                    "Max Reps": max_data["reps"] if max_data["reps"] is not None and max_data["reps"] >= 0 else "",
-                    **{f"Sets W{w}": weekly_counts[w - 1] for w in range(1, len(meso_data["weeks"]) + 1)}
-                })
-        # --- End summary collection for all_exercise_summary_rows ---
-
-        markdown = generate_mesocycle_markdown(meso_data, f"{key}.json", exercise_lookup, frontmatter_template, muscle_group_map)
-
-        with output_file.open("w", encoding="utf-8") as out:
-            out.write(markdown)
-
-        print(f"Saved {output_file}")
-
-    # After all mesocycles processed, save the all_exercise_summary_rows as CSV
-    if all_exercise_summary_rows:
-        import pandas as pd
-        df = pd.DataFrame(all_exercise_summary_rows)
+                    "Day": weekly_sets.index.get_level_values("label"),
+                    "Exercise": [lookup_exercise(exercise_lookup, ex_id).name for ex_id in weekly_sets.index.get_level_values("ex_id")],
+                    "Total Sets": weekly_sets.sum(axis=1).to_numpy(),
+                    "Max Weight": max_effort["weight"].to_numpy(),
+                    "Max Reps": max_reps.where(pd.to_numeric(max_reps) >= 0, "").to_numpy(),
+                    **{f"Sets W{w}": weekly_sets[w].to_numpy() for w in weekly_sets.columns}
+                }))
+            # --- End summary collection for exercise_summary_frames ---
+
+            markdown = list(generate_mesocycle_markdown(meso_data, entries, sets, weekly_sets, max_effort, f"{key}.json", exercise_lookup, frontmatter_template, muscle_group_map, now))
+            writes.append(io_pool.submit(write_markdown, output_file, markdown))
+            drain_writes(writes, IO_WORKERS)
+
+        drain_writes(writes, 0)
+
+    # After all mesocycles processed, save the combined summary frames as CSV
+    if exercise_summary_frames:
+        df = pd.concat(exercise_summary_frames, ignore_index=True).infer_objects()
         df.to_csv(output_dir / "exercise_summary_all.csv", index=False)
 
 if __name__ == "__main__":